@@ -1,16 +1,36 @@
-﻿import os
+﻿import hashlib
+import importlib.util
+import json
+import os
+import re
 import shutil
+import struct
 import subprocess
 import sys
 import tempfile
+import threading
 import wave
-import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
-from PyQt6.QtCore import Qt, QThread, QTimer, QUrl, pyqtSignal, QSize
-from PyQt6.QtGui import QIcon, QPixmap
-from PyQt6.QtMultimedia import QAudioOutput, QMediaPlayer
+import numpy as np
+from PyQt6.QtCore import (
+    Qt,
+    QBuffer,
+    QByteArray,
+    QIODevice,
+    QObject,
+    QProcess,
+    QStandardPaths,
+    QThread,
+    QTimer,
+    pyqtSignal,
+    QSize,
+)
+from PyQt6.QtGui import QIcon, QPixmap, QTextCursor
+from PyQt6.QtMultimedia import QAudio, QAudioFormat, QAudioSink, QMediaDevices
 from PyQt6.QtWidgets import (
     QApplication,
     QComboBox,
@@ -24,21 +44,228 @@ from PyQt6.QtWidgets import (
     QSizePolicy,
     QProgressBar,
     QSizeGrip,
+    QStyle,
     QTextEdit,
     QVBoxLayout,
     QWidget,
 )
 
+try:
+    from piper import PiperVoice
+except Exception:
+    PiperVoice = None
+
+try:
+    # piper-tts >= 1.3
+    from piper import SynthesisConfig
+except Exception:
+    SynthesisConfig = None
+
+_HAVE_PIPER = importlib.util.find_spec("piper") is not None
+_HAVE_PATHVALIDATE = importlib.util.find_spec("pathvalidate") is not None
+
 DEFAULT_RATE = 180
 DEFAULT_PITCH = 1.0
 AUTO_GENERATE_DELAY_MS = 500
 AUTO_GENERATE_DELAY_LARGE_MS = 1200
 LARGE_TEXT_THRESHOLD = 800
 PASTE_DELTA_THRESHOLD = 200
+TEXT_CHANGE_THROTTLE_MS = 50
+DIRTY_TEXT = 1
+DIRTY_PARAMS = 2
+SCHEDULE_TAIL_CHARS = 64
 MIN_LENGTH_SCALE = 0.5
 MAX_LENGTH_SCALE = 2.0
 PITCH_MIN = 0.5
 PITCH_MAX = 2.0
+PLAYBACK_POSITION_INTERVAL_MS = 50
+WAV_SLOT_POOL_SIZE = 6
+SYNTH_MEMO_SIZE = WAV_SLOT_POOL_SIZE - 2
+PLAYER_BUFFER_CACHE_SIZE = 4
+RATE_OPTIONS = [
+    ("Lenticiomo", 90),
+    ("Muito Lento", 120),
+    ("Lento", 150),
+    ("Normal", 180),
+    ("Rapido", 210),
+    ("Muito Rapido", 240),
+    ("Super Rapido", 300),
+]
+LENGTH_SCALE_TABLE = {
+    rate: max(MIN_LENGTH_SCALE, min(MAX_LENGTH_SCALE, DEFAULT_RATE / rate))
+    for _label, rate in RATE_OPTIONS
+}
+CHUNK_FADE_MS = 2
+PITCH_WINDOW_MS = 20
+LIVE_PITCH_BLOCK_MS = 200
+PIPER_READ_CHUNK_BYTES = 64 * 1024
+WAV_HEADER_BYTES = 44
+VOLUME_BLOCK_SAMPLES = 512 * 1024
+MP3_ENCODER_ARGS = ["-c:a", "libmp3lame", "-q:a", "2"]
+SYNTH_CACHE_MAX_ENTRIES = 100
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+STYLESHEET = """
+    QWidget {
+        background-color: #485161;
+        color: #e6e6e6;
+        font-size: 12px;
+    }
+    #headerBar {
+        background-color: #051F1C;
+    }
+    QLabel {
+        color: #f2f2f2;
+    }
+
+    #headerTitle {
+        font-weight: 600;
+        font-size: 13px;
+        color: #FFF;
+    }
+    #headerBar QPushButton {
+        color: #FFF;
+    }
+    QPushButton {
+        background-color: #323232;
+        border: 1px solid #3a3a3a;
+        padding: 4px 10px;
+        border-radius: 6px;
+    }
+    #headerBar QPushButton {
+        background-color: transparent;
+        border: none;
+    }
+    #clearButton {
+        background-color: transparent;
+        border: none;
+    }
+    QPushButton:hover {
+        background-color: #3b3b3b;
+    }
+    QPushButton:pressed {
+        background-color: #2b2b2b;
+    }
+    #closeButton {
+        background-color: #8a2f2f;
+        border-color: #9a3b3b;
+        font-weight: 600;
+    }
+    #closeButton:hover {
+        background-color: #b64545;
+    }
+    #stopButton {
+        background-color: #3a3a3a;
+        border-color: #4a4a4a;
+        font-weight: 600;
+    }
+    #stopButton:hover {
+        background-color: #4a4a4a;
+    }
+    #minButton {
+        font-weight: 700;
+    }
+    QComboBox, QSpinBox, QTextEdit {
+        background-color: #100626;
+        border: 1px solid #fff;
+        font-weight: 500;
+        border-radius: 6px;
+    }
+    QComboBox {
+        min-height: 20px;
+        padding: 2px 8px;
+    }
+    QComboBox QAbstractItemView::item {
+        min-height: 28px;
+        padding: 6px 8px;
+    }
+    QTextEdit {
+        padding: 6px;
+    }
+    QLabel#voiceDirLabel {
+        color: #bdbdbd;
+    }
+    QScrollBar:vertical {
+        background: #1a1a1a;
+        width: 12px;
+        margin: 2px 2px 2px 2px;
+        border-radius: 6px;
+    }
+    QScrollBar::add-page:vertical,
+    QScrollBar::sub-page:vertical {
+        background: #1a1a1a;
+        border-radius: 6px;
+    }
+    QScrollBar::handle:vertical {
+        background: #23d0a6;
+        min-height: 30px;
+        border-radius: 6px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background: #2ce2b5;
+    }
+    QScrollBar::add-line:vertical,
+    QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollBar:horizontal {
+        background: #1a1a1a;
+        height: 12px;
+        margin: 2px 2px 2px 2px;
+        border-radius: 6px;
+    }
+    QScrollBar::add-page:horizontal,
+    QScrollBar::sub-page:horizontal {
+        background: #1a1a1a;
+        border-radius: 6px;
+    }
+    QScrollBar::handle:horizontal {
+        background: #23d0a6;
+        min-width: 24px;
+        border-radius: 6px;
+    }
+    QScrollBar::handle:horizontal:hover {
+        background: #2ce2b5;
+    }
+    QScrollBar::add-line:horizontal,
+    QScrollBar::sub-line:horizontal {
+        width: 0px;
+    }
+    QProgressBar {
+        background-color: #1a1a1a;
+        border: 1px solid #333;
+        border-radius: 6px;
+        height: 10px;
+    }
+    QProgressBar::chunk {
+        background-color: #23d0a6;
+        border-radius: 6px;
+    }
+    #playbackSlider::groove:horizontal {
+        background: #1a1a1a;
+        border: 1px solid #333;
+        height: 8px;
+        border-radius: 4px;
+    }
+    #playbackSlider::sub-page:horizontal {
+        background: #23d0a6;
+        border-radius: 4px;
+    }
+    #playbackSlider::add-page:horizontal {
+        background: #1a1a1a;
+        border-radius: 4px;
+    }
+    #playbackSlider::handle:horizontal {
+        background: #f2f2f2;
+        border: 2px solid #0e6f5a;
+        width: 14px;
+        margin: -4px 0;
+        border-radius: 7px;
+    }
+    #playbackSlider::handle:horizontal:hover {
+        background: #ffffff;
+    }
+"""
 
 
 @dataclass
@@ -115,90 +342,274 @@ class DraggableHeader(QWidget):
 class TTSEngineService:
     def __init__(self, voices_dir: Path):
         self._voices_dir = voices_dir
+        self._loaded_voices = {}
+        self._voice_lock = threading.Lock()
+        self._synth_lock = threading.Lock()
+        self._cache_dir = self._default_cache_dir()
+        self._voices_cache: tuple[int, list] | None = None
+        self._model_configs: dict[str, Path] = {}
+        self._ffmpeg_filters: dict[str, str] = {}
 
     def set_voices_dir(self, voices_dir: Path):
         self._voices_dir = voices_dir
+        self._voices_cache = None
 
     def list_voices(self):
+        try:
+            mtime = os.stat(self._voices_dir).st_mtime_ns
+        except OSError:
+            return []
+        if self._voices_cache is not None and self._voices_cache[0] == mtime:
+            return list(self._voices_cache[1])
+
         voices = []
         for onnx_path in sorted(self._voices_dir.glob("*.onnx")):
             voices.append((str(onnx_path), onnx_path.stem))
-        return voices
+        self._voices_cache = (mtime, voices)
+        return list(voices)
 
     def _ensure_model_config(self, model_path: Path) -> Path | None:
+        cached = self._model_configs.get(str(model_path))
+        if cached is not None:
+            return cached
+
         expected = Path(str(model_path) + ".json")
         if expected.exists():
+            self._model_configs[str(model_path)] = expected
             return expected
 
         alt = model_path.with_suffix(".json")
         if alt.exists():
             try:
-                shutil.copyfile(alt, expected)
-                return expected
+                self._clone(alt, expected)
             except Exception:
                 return None
+            self._model_configs[str(model_path)] = expected
+            return expected
         return None
 
-    def _check_dependencies(self):
+    def _read_sample_rate(self, config_path: Path) -> int:
         try:
-            import importlib.util
-        except Exception as exc:
-            raise RuntimeError("Falha ao verificar dependencias do Piper.") from exc
+            with open(config_path, "r", encoding="utf-8") as f:
+                return int(json.load(f)["audio"]["sample_rate"])
+        except Exception:
+            return 22050
 
-        if importlib.util.find_spec("piper") is None:
+    def _check_dependencies(self):
+        if not _HAVE_PIPER:
             raise RuntimeError(
                 "piper-tts nao instalado. Execute: py -3 -m pip install piper-tts"
             )
-        if importlib.util.find_spec("pathvalidate") is None:
+        if not _HAVE_PATHVALIDATE:
             raise RuntimeError(
                 "Dependencia 'pathvalidate' ausente. Execute: py -3 -m pip install pathvalidate"
             )
 
     def _rate_to_length_scale(self, rate: int) -> float:
+        scale = LENGTH_SCALE_TABLE.get(rate)
+        if scale is not None:
+            return scale
         if rate <= 0:
             return 1.0
         scale = DEFAULT_RATE / rate
         return max(MIN_LENGTH_SCALE, min(MAX_LENGTH_SCALE, scale))
 
-    def synthesize_to_wav(self, text: str, config: TTSConfig, out_path: str):
-        self._check_dependencies()
+    def _load_voice(self, model_path: Path, config_path: Path):
+        if PiperVoice is None:
+            return None
+
+        key = (str(model_path), model_path.stat().st_mtime_ns)
+        with self._voice_lock:
+            voice = self._loaded_voices.get(key)
+            if voice is None:
+                voice = PiperVoice.load(str(model_path), config_path=str(config_path))
+                for stale_key in [k for k in self._loaded_voices if k[0] == key[0]]:
+                    del self._loaded_voices[stale_key]
+                self._loaded_voices[key] = voice
+        return voice
+
+    def _check_cancelled(self, is_cancelled):
+        if is_cancelled is not None and is_cancelled():
+            raise RuntimeError("Sintese cancelada.")
+
+    def _synthesize_with_voice(
+        self, voice, text: str, length_scale: float, out_path: str, is_cancelled=None
+    ):
+        # Escreve frase a frase para poder abandonar a sintese entre elas
+        with wave.open(out_path, "wb") as wav_file:
+            if SynthesisConfig is not None and hasattr(voice, "synthesize_wav"):
+                syn_config = SynthesisConfig(length_scale=length_scale)
+                params_set = False
+                for chunk in voice.synthesize(text, syn_config=syn_config):
+                    if not params_set:
+                        wav_file.setframerate(chunk.sample_rate)
+                        wav_file.setsampwidth(chunk.sample_width)
+                        wav_file.setnchannels(chunk.sample_channels)
+                        params_set = True
+                    wav_file.writeframes(chunk.audio_int16_bytes)
+                    self._check_cancelled(is_cancelled)
+                if not params_set:
+                    wav_file.setframerate(voice.config.sample_rate)
+                    wav_file.setsampwidth(2)
+                    wav_file.setnchannels(1)
+            else:
+                wav_file.setframerate(voice.config.sample_rate)
+                wav_file.setsampwidth(2)
+                wav_file.setnchannels(1)
+                for audio_bytes in voice.synthesize_stream_raw(text, length_scale=length_scale):
+                    wav_file.writeframes(audio_bytes)
+                    self._check_cancelled(is_cancelled)
+
+    def _default_cache_dir(self) -> Path:
+        # Pasta por usuario: o tempdir e compartilhado com outros usuarios da maquina
+        location = QStandardPaths.writableLocation(
+            QStandardPaths.StandardLocation.CacheLocation
+        )
+        base = Path(location) if location else Path.home() / ".cache" / "t2a"
+        return base / "synth"
+
+    def _cache_key(self, text: str, config: TTSConfig) -> str:
+        # Tamanho e mtime do modelo invalidam o cache quando a voz e substituida
+        try:
+            st = os.stat(config.voice_id)
+            model_stamp = f"{st.st_size}|{st.st_mtime_ns}"
+        except (OSError, TypeError):
+            model_stamp = ""
+        raw = f"{text}|{config.voice_id}|{model_stamp}|{config.rate}".encode("utf-8")
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+    def _load_from_cache(self, cache_path: Path, out_path: str) -> bool:
+        try:
+            os.utime(cache_path)
+            self._clone(cache_path, out_path)
+        except OSError:
+            return False
+        return True
+
+    def _store_in_cache(self, wav_path: str, cache_path: Path):
+        try:
+            self._cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+            os.chmod(self._cache_dir, 0o700)
+            tmp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+            self._clone(wav_path, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            return
+        self._trim_cache()
 
+    def _trim_cache(self):
+        try:
+            entries = list(self._cache_dir.glob("*.wav"))
+        except OSError:
+            return
+        if len(entries) <= SYNTH_CACHE_MAX_ENTRIES:
+            return
+
+        def mtime(path: Path) -> float:
+            try:
+                return path.stat().st_mtime
+            except OSError:
+                return 0.0
+
+        entries.sort(key=mtime)
+        for path in entries[: len(entries) - SYNTH_CACHE_MAX_ENTRIES]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def synthesize_to_wav(
+        self,
+        text: str,
+        config: TTSConfig,
+        out_path: str,
+        on_process=None,
+        is_cancelled=None,
+    ):
+        cache_path = self._cache_dir / f"{self._cache_key(text, config)}.wav"
+        # Uma sintese por vez (o PiperVoice e compartilhado); pedidos cancelados
+        # enquanto esperavam saem sem sintetizar
+        with self._synth_lock:
+            self._check_cancelled(is_cancelled)
+            if cache_path.exists() and self._load_from_cache(cache_path, out_path):
+                return
+            self._synthesize_uncached(text, config, out_path, on_process, is_cancelled)
+        self._store_in_cache(out_path, cache_path)
+
+    def _synthesize_uncached(
+        self,
+        text: str,
+        config: TTSConfig,
+        out_path: str,
+        on_process=None,
+        is_cancelled=None,
+    ):
         model_path = Path(config.voice_id)
         if not model_path.exists():
             raise RuntimeError("Modelo .onnx nao encontrado.")
 
-        if not self._ensure_model_config(model_path):
+        config_path = self._ensure_model_config(model_path)
+        if not config_path:
             raise RuntimeError(
                 "Arquivo .onnx.json nao encontrado. Renomeie o .json para .onnx.json."
             )
 
         length_scale = self._rate_to_length_scale(config.rate)
+        voice = self._load_voice(model_path, config_path)
+        if voice is not None:
+            self._synthesize_with_voice(voice, text, length_scale, out_path, is_cancelled)
+            return
+
+        self._check_dependencies()
         cmd = [
             sys.executable,
             "-m",
             "piper",
             "-m",
             str(model_path),
-            "-f",
-            out_path,
+            "--output-raw",
             "--length_scale",
             f"{length_scale:.3f}",
             "--",
             text,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            detail = (result.stderr or result.stdout).strip()
-            raise RuntimeError(detail or "Falha ao executar o Piper.")
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+            if on_process is not None:
+                on_process(proc)
+            # O audio PCM vem direto do stdout do Piper, sem .wav intermediario
+            with wave.open(out_path, "wb") as wf:
+                wf.setnchannels(1)
+                wf.setsampwidth(2)
+                wf.setframerate(self._read_sample_rate(config_path))
+                while True:
+                    data = proc.stdout.read(PIPER_READ_CHUNK_BYTES)
+                    if not data:
+                        break
+                    wf.writeframes(data)
+            proc.stdout.close()
+            proc.wait()
+            if proc.returncode != 0:
+                stderr_file.seek(0)
+                detail = stderr_file.read().decode(errors="replace").strip()
+                raise RuntimeError(detail or "Falha ao executar o Piper.")
 
         # Pitch e volume serao aplicados em pos-processamento (preview/salvar)
 
-    def apply_pitch_to_wav(self, src_path: str, dest_path: str, pitch: float):
-        if abs(pitch - 1.0) < 0.001:
-            if src_path != dest_path:
-                shutil.copyfile(src_path, dest_path)
-            return
+    def _read_framerate(self, wav_path: str) -> int:
+        # Cabecalho RIFF/WAVE com o chunk fmt logo no inicio: taxa no offset 24
+        with open(wav_path, "rb") as f:
+            header = f.read(28)
+        if (
+            len(header) == 28
+            and header[0:4] == b"RIFF"
+            and header[8:16] == b"WAVEfmt "
+        ):
+            return struct.unpack_from("<I", header, 24)[0]
+        with wave.open(wav_path, "rb") as wf:
+            return wf.getframerate()
 
+    def build_pitch_command(self, src_path: str, dest_path: str, pitch: float) -> list[str]:
         if pitch < PITCH_MIN or pitch > PITCH_MAX:
             raise RuntimeError("Pitch fora do limite permitido (50% a 200%).")
 
@@ -208,16 +619,12 @@ class TTSEngineService:
                 "Para ajustar o pitch, instale o ffmpeg ou mantenha o pitch em 100."
             )
 
-        with wave.open(src_path, "rb") as wf:
-            framerate = wf.getframerate()
+        framerate = self._read_framerate(src_path)
 
         asetrate = max(8000, int(framerate * pitch))
         atempo = 1.0 / pitch
         filter_arg = f"asetrate={asetrate},atempo={atempo:.5f}"
-
-        fd, tmp_path = tempfile.mkstemp(suffix=".wav")
-        os.close(fd)
-        cmd = [
+        return [
             ffmpeg_path,
             "-y",
             "-loglevel",
@@ -226,98 +633,838 @@ class TTSEngineService:
             src_path,
             "-filter:a",
             filter_arg,
-            tmp_path,
+            dest_path,
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            detail = (result.stderr or result.stdout).strip()
-            raise RuntimeError(detail or "Falha ao ajustar o pitch.")
 
-        if dest_path == src_path:
-            shutil.move(tmp_path, dest_path)
-        else:
-            shutil.move(tmp_path, dest_path)
+    def can_shift_pitch_in_process(self, wav_path: str) -> bool:
+        try:
+            with wave.open(wav_path, "rb") as wf:
+                return wf.getsampwidth() == 2 and wf.getnchannels() == 1
+        except Exception:
+            return False
+
+    def _shift_pitch_in_process(
+        self, src_path: str, dest_path: str, pitch: float, volume: float = 1.0
+    ):
+        with wave.open(src_path, "rb") as wf:
+            params = wf.getparams()
+            frames = wf.readframes(wf.getnframes())
+
+        # Mesmo efeito de asetrate + atempo: sobe a taxa declarada e estica
+        # o sinal em `pitch` para manter a duracao original
+        framerate = max(8000, int(params.framerate * pitch))
+        window = max(32, framerate * PITCH_WINDOW_MS // 1000)
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32)
+        stretched = _time_stretch(samples, pitch, window)
+        if abs(volume - 1.0) >= 0.001:
+            stretched *= volume
+        np.clip(stretched, -32768, 32767, out=stretched)
+        self._write_wav(
+            dest_path,
+            params._replace(framerate=framerate),
+            stretched.astype("<i2").tobytes(),
+        )
 
     def _apply_volume_to_wav(self, src_path: str, dest_path: str, volume: float):
         volume_factor = max(0.0, min(2.0, volume))
         if volume_factor == 1.0:
             if src_path != dest_path:
-                shutil.copyfile(src_path, dest_path)
+                self._clone(src_path, dest_path)
             return
 
         with wave.open(src_path, "rb") as wf:
             params = wf.getparams()
-            frames = wf.readframes(wf.getnframes())
 
-        sampwidth = params.sampwidth
-        nchannels = params.nchannels
-        framerate = params.framerate
+        if params.sampwidth != 2:
+            return
 
-        if sampwidth != 2:
+        sample_count = params.nframes * params.nchannels
+        if (
+            sample_count > 0
+            and src_path != dest_path
+            and os.path.getsize(src_path) == WAV_HEADER_BYTES + sample_count * 2
+        ):
+            # Cabecalho PCM simples: mapeia os dados sem carregar o arquivo inteiro
+            samples = np.memmap(
+                src_path, dtype="<i2", mode="r", offset=WAV_HEADER_BYTES, shape=(sample_count,)
+            )
+        else:
+            with wave.open(src_path, "rb") as wf:
+                samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2")
+
+        scale = int(round(volume_factor * 4096))
+        self._detach_output(dest_path)
+        with wave.open(dest_path, "wb") as wf:
+            wf.setnchannels(params.nchannels)
+            wf.setsampwidth(params.sampwidth)
+            wf.setframerate(params.framerate)
+            for start in range(0, len(samples), VOLUME_BLOCK_SAMPLES):
+                block = samples[start : start + VOLUME_BLOCK_SAMPLES].astype(np.int32)
+                block *= scale
+                block >>= 12
+                np.clip(block, -32768, 32767, out=block)
+                wf.writeframes(block.astype("<i2").tobytes())
+        del samples
+
+    def _ffmpeg_has_filter(self, ffmpeg_path: str, name: str) -> bool:
+        if ffmpeg_path not in self._ffmpeg_filters:
+            try:
+                result = subprocess.run(
+                    [ffmpeg_path, "-hide_banner", "-filters"],
+                    capture_output=True,
+                    text=True,
+                )
+                self._ffmpeg_filters[ffmpeg_path] = result.stdout
+            except OSError:
+                self._ffmpeg_filters[ffmpeg_path] = ""
+        pattern = rf"\s{re.escape(name)}\s"
+        return re.search(pattern, self._ffmpeg_filters[ffmpeg_path]) is not None
+
+    def _build_filter_chain(
+        self, framerate: int, pitch: float, volume: float, rubberband: bool = False
+    ) -> str:
+        filters = []
+        if abs(pitch - 1.0) >= 0.001 and rubberband:
+            filters.append(f"rubberband=pitch={pitch:.5f}")
+        elif abs(pitch - 1.0) >= 0.001:
+            asetrate = max(8000, int(framerate * pitch))
+            filters.append(f"asetrate={asetrate}")
+            filters.append(f"aresample={framerate}")
+            filters.append(f"atempo={1.0 / pitch:.5f}")
+        if abs(volume - 1.0) >= 0.001:
+            filters.append(f"volume={volume:.3f}")
+        return ",".join(filters)
+
+    def split_sentences(self, text: str) -> list[str]:
+        return [part.strip() for part in SENTENCE_SPLIT_RE.split(text) if part.strip()]
+
+    def fade_wav_edges(self, wav_path: str):
+        with wave.open(wav_path, "rb") as wf:
+            params = wf.getparams()
+            frames = wf.readframes(wf.getnframes())
+
+        if params.sampwidth != 2:
+            return params, frames
+
+        samples = np.frombuffer(frames, dtype="<i2").reshape(-1, params.nchannels)
+        fade_len = min(len(samples) // 2, params.framerate * CHUNK_FADE_MS // 1000)
+        if fade_len > 0:
+            samples = samples.astype(np.float32)
+            ramp = np.linspace(0.0, 1.0, fade_len, dtype=np.float32)[:, None]
+            samples[:fade_len] *= ramp
+            samples[-fade_len:] *= ramp[::-1]
+            frames = samples.astype("<i2").tobytes()
+            self._write_wav(wav_path, params, frames)
+        return params, frames
+
+    def _clone(self, src_path, dest_path):
+        # Hardlink quando possivel (mesmo volume): O(1) e sem bytes extras
+        try:
+            os.remove(dest_path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(src_path, dest_path)
+        except OSError:
+            self.copy_file(src_path, dest_path)
+
+    def copy_file(self, src_path: str, dest_path: str):
+        # copy_file_range copia dentro do kernel (reflink em btrfs/xfs); senao copyfile
+        if not hasattr(os, "copy_file_range"):
+            shutil.copyfile(src_path, dest_path)
             return
+        try:
+            with open(src_path, "rb") as src, open(dest_path, "wb") as dest:
+                if hasattr(os, "posix_fadvise"):
+                    os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dest.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining > 0:
+                raise OSError("Copia incompleta.")
+        except OSError:
+            shutil.copyfile(src_path, dest_path)
+
+    def _detach_output(self, path: str):
+        # Escrever por cima de um hardlink alteraria tambem o cache/preview
+        try:
+            if os.stat(path).st_nlink > 1:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _write_wav(self, path: str, params, frames: bytes):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with wave.open(tmp_path, "wb") as wf:
+            wf.setnchannels(params.nchannels)
+            wf.setsampwidth(params.sampwidth)
+            wf.setframerate(params.framerate)
+            wf.writeframes(frames)
+        os.replace(tmp_path, path)
 
-        import array
+    def export_audio(self, src_path: str, dest_path: str, pitch: float, volume: float):
+        if pitch < PITCH_MIN or pitch > PITCH_MAX:
+            raise RuntimeError("Pitch fora do limite permitido (50% a 200%).")
 
-        samples = array.array("h")
-        samples.frombytes(frames)
-        if sys.byteorder != "little":
-            samples.byteswap()
+        volume = max(0.0, min(2.0, volume))
+        ext = Path(dest_path).suffix.lower()
+        ffmpeg_path = shutil.which("ffmpeg")
+        if not ffmpeg_path:
+            if ext == ".mp3":
+                raise RuntimeError("ffmpeg nao encontrado. Instale o ffmpeg para exportar mp3.")
+            if abs(pitch - 1.0) >= 0.001 and self.can_shift_pitch_in_process(src_path):
+                self._shift_pitch_in_process(src_path, dest_path, pitch, volume)
+                return
+            if abs(pitch - 1.0) >= 0.001:
+                raise RuntimeError(
+                    "Para ajustar o pitch, instale o ffmpeg ou mantenha o pitch em 100."
+                )
+            self._apply_volume_to_wav(src_path, dest_path, volume)
+            return
 
-        max_amp = 32767
-        min_amp = -32768
-        for i, value in enumerate(samples):
-            scaled = int(value * volume_factor)
-            if scaled > max_amp:
-                scaled = max_amp
-            elif scaled < min_amp:
-                scaled = min_amp
-            samples[i] = scaled
+        self._run_ffmpeg_export(ffmpeg_path, src_path, dest_path, pitch, volume)
+
+    def _run_ffmpeg_export(
+        self, ffmpeg_path: str, src_path: str, dest_path: str, pitch: float, volume: float
+    ):
+        cmd = [ffmpeg_path, "-y", "-loglevel", "error", "-i", src_path]
+        framerate = 0
+        rubberband = False
+        if abs(pitch - 1.0) >= 0.001:
+            # rubberband preserva formantes e dispensa o resample; senao asetrate/atempo
+            rubberband = self._ffmpeg_has_filter(ffmpeg_path, "rubberband")
+            if not rubberband:
+                framerate = self._read_framerate(src_path)
+        filter_arg = self._build_filter_chain(framerate, pitch, volume, rubberband)
+        if filter_arg:
+            cmd += ["-filter:a", filter_arg]
+        if Path(dest_path).suffix.lower() == ".mp3":
+            cmd += MP3_ENCODER_ARGS
+        else:
+            cmd += ["-c:a", "pcm_s16le", "-f", "wav"]
+        cmd.append(dest_path)
 
-        if sys.byteorder != "little":
-            samples.byteswap()
-        frames = samples.tobytes()
+        self._detach_output(dest_path)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            detail = (result.stderr or result.stdout).strip()
+            raise RuntimeError(detail or "Falha ao exportar o audio.")
+
+
+def _time_stretch(samples: np.ndarray, ratio: float, window: int) -> np.ndarray:
+    # WSOLA: janelas Hann com 50% de sobreposicao, cada uma alinhada
+    # (dentro de +-tolerance) com a continuacao natural da anterior
+    hop_out = window // 2
+    hop_in = hop_out / ratio
+    tolerance = window // 4
+    out_len = int(len(samples) * ratio)
+    n_frames = out_len // hop_out + 1
+    padded = np.concatenate(
+        [
+            np.zeros(tolerance, dtype=np.float32),
+            samples,
+            np.zeros(2 * window + tolerance + int(hop_in) + hop_out, dtype=np.float32),
+        ]
+    )
+    hann = np.hanning(window + 1)[:-1].astype(np.float32)
+    out = np.zeros(n_frames * hop_out + window, dtype=np.float32)
+
+    prev = tolerance
+    for k in range(n_frames):
+        nominal = tolerance + int(round(k * hop_in))
+        best = nominal
+        if k > 0:
+            template = padded[prev + hop_out : prev + hop_out + window]
+            region = padded[nominal - tolerance : nominal + tolerance + window]
+            corr = np.correlate(region, template, "valid")
+            best = nominal - tolerance + int(np.argmax(corr))
+        out[k * hop_out : k * hop_out + window] += hann * padded[best : best + window]
+        prev = best
+    return out[:out_len]
+
+
+def _safe_unlink(path: str):
+    try:
+        os.remove(path)
+    except Exception:
+        pass
+
+
+class _WavSlotPool:
+    def __init__(self, size: int):
+        self._size = size
+        self._slots = []
+        self._free = []
+        for _ in range(size):
+            self._free.append(self._create_slot())
+
+    def _create_slot(self) -> str:
+        with tempfile.NamedTemporaryFile(prefix="t2a_", suffix=".wav", delete=False) as f:
+            path = f.name
+        self._slots.append(path)
+        return path
 
-        with wave.open(dest_path, "wb") as wf:
-            wf.setnchannels(nchannels)
-            wf.setsampwidth(sampwidth)
-            wf.setframerate(framerate)
-            wf.writeframes(frames)
+    def has_free(self) -> bool:
+        return bool(self._free)
 
-    def convert_wav_to_mp3(self, wav_path: str, mp3_path: str, volume: float = 1.0):
-        try:
-            from pydub import AudioSegment
-        except Exception as exc:
-            raise RuntimeError(
-                "pydub nao instalado. Instale pydub e ffmpeg para exportar mp3."
-            ) from exc
+    def acquire(self) -> str:
+        if self._free:
+            return self._free.pop()
+        return self._create_slot()
 
-        audio = AudioSegment.from_wav(wav_path)
-        if volume < 0.001:
-            audio = audio - 120
-        elif abs(volume - 1.0) >= 0.001:
-            gain_db = 20.0 * math.log10(volume)
-            audio = audio.apply_gain(gain_db)
-        audio.export(mp3_path, format="mp3")
+    def release(self, path: str):
+        if path not in self._slots or path in self._free:
+            return
+        # Slots criados alem do tamanho fixo sao descartados ao voltar
+        if len(self._slots) > self._size:
+            self._slots.remove(path)
+            _safe_unlink(path)
+            return
+        self._free.append(path)
+
+    def drain(self) -> list[str]:
+        slots = self._slots
+        self._slots = []
+        self._free = []
+        return slots
 
 
 class SynthesisWorker(QThread):
     finished = pyqtSignal(bool, str, str)
 
-    def __init__(self, service: TTSEngineService, text: str, config: TTSConfig, out_path: str):
+    def __init__(
+        self,
+        service: TTSEngineService,
+        text: str,
+        config: TTSConfig,
+        out_path: str,
+        req_id: int = 0,
+    ):
         super().__init__()
         self._service = service
         self._text = text
         self._config = config
         self._out_path = out_path
+        self.req_id = req_id
+        self._proc = None
+        self._cancelled = False
+
+    @property
+    def out_path(self) -> str:
+        return self._out_path
+
+    def _set_proc(self, proc):
+        self._proc = proc
+        if self._cancelled:
+            proc.terminate()
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def config(self) -> TTSConfig:
+        return self._config
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def request_cancel(self):
+        self._cancelled = True
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+
+    def _synthesize(self, text: str, out_path: str):
+        if self._cancelled:
+            raise RuntimeError("Sintese cancelada.")
+        self._service.synthesize_to_wav(
+            text, self._config, out_path, self._set_proc, lambda: self._cancelled
+        )
+
+    def _part_path(self, suffix: str) -> str:
+        base, _ext = os.path.splitext(self._out_path)
+        return f"{base}_{self.req_id}_{suffix}.wav"
+
+    def _emit_finished(self, ok: bool, message: str, path: str):
+        # Pedidos cancelados terminam em silencio; o proximo worker assume a UI
+        if not self._cancelled:
+            self.finished.emit(ok, message, path)
 
     def run(self):
+        part_path = self._part_path("part")
         try:
-            self._service.synthesize_to_wav(self._text, self._config, self._out_path)
-            self.finished.emit(True, "OK", self._out_path)
+            self._synthesize(self._text, part_path)
+            # Workers cancelados nao sobrescrevem o preview do pedido atual
+            if self._cancelled:
+                raise RuntimeError("Sintese cancelada.")
+            os.replace(part_path, self._out_path)
+            self._emit_finished(True, "OK", self._out_path)
+        except Exception as exc:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            self._emit_finished(False, str(exc), "")
+
+
+class SynthesisPipelineWorker(SynthesisWorker):
+    chunk_ready = pyqtSignal(int, str)
+
+    def __init__(
+        self,
+        service: TTSEngineService,
+        text: str,
+        config: TTSConfig,
+        out_path: str,
+        req_id: int = 0,
+    ):
+        super().__init__(service, text, config, out_path, req_id)
+        self.chunk_paths = []
+
+    def run(self):
+        chunks = self._service.split_sentences(self._text)
+        if len(chunks) <= 1:
+            super().run()
+            return
+
+        self.chunk_paths = [self._part_path(str(idx)) for idx in range(len(chunks))]
+        emitted = 0
+        try:
+            params = None
+            frames = []
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(self._synthesize, chunks[0], self.chunk_paths[0])
+                for idx, chunk_path in enumerate(self.chunk_paths):
+                    future.result()
+                    # Sintetiza o proximo trecho enquanto este e finalizado/tocado
+                    if idx + 1 < len(chunks):
+                        future = executor.submit(
+                            self._synthesize, chunks[idx + 1], self.chunk_paths[idx + 1]
+                        )
+                    params, chunk_frames = self._service.fade_wav_edges(chunk_path)
+                    frames.append(chunk_frames)
+                    self.chunk_ready.emit(idx, chunk_path)
+                    emitted = idx + 1
+
+            if self._cancelled:
+                raise RuntimeError("Sintese cancelada.")
+            self._service._write_wav(self._out_path, params, b"".join(frames))
+            self._emit_finished(True, "OK", self._out_path)
+        except Exception as exc:
+            # Trechos ja emitidos ficam a cargo da UI; os demais (inclusive o que falhou
+            # no meio da escrita) sao removidos aqui
+            for chunk_path in self.chunk_paths[emitted:]:
+                _safe_unlink(chunk_path)
+            self._emit_finished(False, str(exc), "")
+
+        if self._cancelled:
+            for chunk_path in self.chunk_paths:
+                _safe_unlink(chunk_path)
+
+
+class ExportWorker(QThread):
+    finished = pyqtSignal(bool, str, str)
+
+    def __init__(
+        self,
+        service: TTSEngineService,
+        src_path: str,
+        dest_path: str,
+        pitch: float,
+        volume: float,
+    ):
+        super().__init__()
+        self._service = service
+        self._src_path = src_path
+        self._dest_path = dest_path
+        self._pitch = pitch
+        self._volume = volume
+
+    def run(self):
+        try:
+            ext = os.path.splitext(self._dest_path)[1].lower()
+            if (
+                ext != ".mp3"
+                and abs(self._pitch - 1.0) < 0.001
+                and abs(self._volume - 1.0) < 0.001
+            ):
+                self._service._detach_output(self._dest_path)
+                self._service.copy_file(self._src_path, self._dest_path)
+            else:
+                self._service.export_audio(
+                    self._src_path, self._dest_path, self._pitch, self._volume
+                )
+            self.finished.emit(True, "OK", self._dest_path)
         except Exception as exc:
             self.finished.emit(False, str(exc), "")
 
 
+class LivePitchSource(QIODevice):
+    def __init__(
+        self,
+        samples: np.ndarray,
+        framerate: int,
+        pitch: float,
+        parent: QObject | None = None,
+    ):
+        super().__init__(parent)
+        self._samples = samples
+        self._framerate = framerate
+        self._block = max(1, framerate * LIVE_PITCH_BLOCK_MS // 1000)
+        self._block_index = -1
+        self._block_data = b""
+        self._tail = None
+        self.set_pitch(pitch)
+
+    def set_pitch(self, pitch: float):
+        self._pitch = pitch
+        self._window = max(32, int(self._framerate * pitch) * PITCH_WINDOW_MS // 1000)
+        self._pad = 2 * self._window
+        self._fade = min(self._window, self._block)
+        self._block_index = -1
+        self._tail = None
+
+    def isSequential(self) -> bool:
+        return False
+
+    def size(self) -> int:
+        return len(self._samples) * 2
+
+    def writeData(self, _data) -> int:
+        return -1
+
+    def readData(self, maxlen: int) -> bytes:
+        pos = self.pos()
+        if pos >= self.size():
+            return b""
+        sample = pos // 2
+        index = sample // self._block
+        data = self._render(index)
+        offset = (sample - index * self._block) * 2
+        return data[offset : offset + maxlen - maxlen % 2]
+
+    def _render(self, index: int) -> bytes:
+        if index == self._block_index:
+            return self._block_data
+
+        # Cada bloco e esticado com folga dos dois lados e reamostrado de volta
+        # ao tamanho original: mesma duracao, pitch deslocado
+        total = len(self._samples)
+        start = index * self._block
+        lo = start - self._pad
+        hi = start + self._block + self._pad
+        segment = np.zeros(hi - lo, dtype=np.float32)
+        segment[max(0, -lo) : min(total, hi) - lo] = self._samples[max(0, lo) : min(total, hi)]
+        if abs(self._pitch - 1.0) < 0.001:
+            shifted = segment
+        else:
+            stretched = _time_stretch(segment, self._pitch, self._window)
+            shifted = np.interp(
+                np.linspace(0, len(stretched) - 1, len(segment)),
+                np.arange(len(stretched), dtype=np.float64),
+                stretched,
+            ).astype(np.float32)
+
+        core = shifted[self._pad : self._pad + self._block].copy()
+        if self._tail is not None and index == self._block_index + 1:
+            ramp = np.linspace(0.0, 1.0, self._fade, dtype=np.float32)
+            core[: self._fade] = core[: self._fade] * ramp + self._tail * (1.0 - ramp)
+        tail_start = self._pad + self._block
+        self._tail = shifted[tail_start : tail_start + self._fade].copy()
+
+        core = core[: max(0, total - start)]
+        np.clip(core, -32768, 32767, out=core)
+        self._block_index = index
+        self._block_data = core.astype("<i2").tobytes()
+        return self._block_data
+
+
+class PcmPlayer(QObject):
+    StoppedState = 0
+    PlayingState = 1
+    PausedState = 2
+
+    positionChanged = pyqtSignal(int)
+    durationChanged = pyqtSignal(int)
+    playbackStateChanged = pyqtSignal(int)
+    endOfMedia = pyqtSignal()
+    errorOccurred = pyqtSignal(str)
+
+    def __init__(self, parent: QObject | None = None):
+        super().__init__(parent)
+        self._buffer = QBuffer(self)
+        self._device = self._buffer
+        self._live = None
+        self._sink = None
+        self._format = None
+        self._volume = 1.0
+        self._bytes_per_frame = 2
+        self._framerate = 0
+        self._start_bytes = 0
+        self._state = self.StoppedState
+        self._restarting = False
+        self._decoded = OrderedDict()
+        self._loaded_key = None
+
+        self._position_timer = QTimer(self)
+        self._position_timer.setInterval(PLAYBACK_POSITION_INTERVAL_MS)
+        self._position_timer.timeout.connect(self._emit_position)
+
+    def playbackState(self) -> int:
+        return self._state
+
+    def setVolume(self, volume: float):
+        self._volume = volume
+        if self._sink is not None:
+            self._sink.setVolume(volume)
+
+    def _decode(self, wav_path: str, device) -> tuple[QAudioFormat, int, QByteArray]:
+        with wave.open(wav_path, "rb") as wf:
+            params = wf.getparams()
+            frames = wf.readframes(wf.getnframes())
+        if params.sampwidth != 2:
+            raise RuntimeError("Formato de audio nao suportado para o preview.")
+
+        fmt = self._make_format(
+            params.framerate, params.nchannels, QAudioFormat.SampleFormat.Int16
+        )
+        if device.isFormatSupported(fmt):
+            return fmt, params.nchannels, QByteArray(frames)
+
+        # Adapta ao formato preferido do dispositivo: primeiro so a taxa (pitch via
+        # asetrate), depois canais e formato de amostra
+        preferred = device.preferredFormat()
+        samples = np.frombuffer(frames, dtype="<i2").reshape(-1, params.nchannels)
+        samples = samples.astype(np.float32) / 32768.0
+        if preferred.sampleRate() != params.framerate:
+            samples = self._resample(samples, params.framerate, preferred.sampleRate())
+        fmt = self._make_format(
+            preferred.sampleRate(), params.nchannels, QAudioFormat.SampleFormat.Int16
+        )
+        if not device.isFormatSupported(fmt):
+            channels = preferred.channelCount()
+            if channels != params.nchannels:
+                mono = samples.mean(axis=1, keepdims=True)
+                samples = np.repeat(mono, channels, axis=1)
+            fmt = self._make_format(preferred.sampleRate(), channels, preferred.sampleFormat())
+            if not device.isFormatSupported(fmt):
+                raise RuntimeError("Formato de audio nao suportado pelo dispositivo de saida.")
+        return fmt, fmt.channelCount(), QByteArray(self._encode(samples, fmt.sampleFormat()))
+
+    def _make_format(self, framerate: int, channels: int, sample_format) -> QAudioFormat:
+        fmt = QAudioFormat()
+        fmt.setSampleRate(framerate)
+        fmt.setChannelCount(channels)
+        fmt.setSampleFormat(sample_format)
+        return fmt
+
+    def _encode(self, samples: np.ndarray, sample_format) -> bytes:
+        samples = np.clip(samples, -1.0, 1.0)
+        if sample_format == QAudioFormat.SampleFormat.Int16:
+            return (samples * 32767).astype(np.int16).tobytes()
+        if sample_format == QAudioFormat.SampleFormat.Int32:
+            return (samples * 2147483647).astype(np.int32).tobytes()
+        if sample_format == QAudioFormat.SampleFormat.Float:
+            return samples.astype(np.float32).tobytes()
+        if sample_format == QAudioFormat.SampleFormat.UInt8:
+            return (samples * 127 + 128).astype(np.uint8).tobytes()
+        raise RuntimeError("Formato de audio nao suportado pelo dispositivo de saida.")
+
+    def _decoded_data(self, wav_path: str, device):
+        st = os.stat(wav_path)
+        key = (wav_path, st.st_ino, st.st_mtime_ns, st.st_size)
+        # PCM ja decodificado e reaproveitado: trocar de preview vira troca de buffer
+        cached = self._decoded.get(wav_path)
+        if cached is not None and cached[0] == key:
+            self._decoded.move_to_end(wav_path)
+            return cached
+        fmt, nchannels, data = self._decode(wav_path, device)
+        self._decoded[wav_path] = (key, fmt, nchannels, data)
+        while len(self._decoded) > PLAYER_BUFFER_CACHE_SIZE:
+            self._decoded.popitem(last=False)
+        return self._decoded[wav_path]
+
+    def _drop_live(self):
+        if self._live is not None:
+            self._live.close()
+            self._live.deleteLater()
+            self._live = None
+        self._device = self._buffer
+
+    def _attach_sink(self, device, fmt: QAudioFormat, nchannels: int):
+        self.stop()
+        self._drop_live()
+        if self._sink is None or self._format != fmt:
+            if self._sink is not None:
+                self._sink.stateChanged.disconnect(self._on_sink_state_changed)
+                self._sink.deleteLater()
+            self._sink = QAudioSink(device, fmt, self)
+            self._sink.setVolume(self._volume)
+            self._sink.stateChanged.connect(self._on_sink_state_changed)
+            self._format = fmt
+        self._bytes_per_frame = fmt.bytesPerFrame()
+        self._framerate = fmt.sampleRate()
+
+    def load(self, wav_path: str):
+        device = QMediaDevices.defaultAudioOutput()
+        key, fmt, nchannels, data = self._decoded_data(wav_path, device)
+        self._attach_sink(device, fmt, nchannels)
+        if self._loaded_key != key:
+            self._buffer.close()
+            self._buffer.setData(data)
+            self._buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+            self._loaded_key = key
+        self._start_bytes = 0
+        self.durationChanged.emit(self._bytes_to_ms(data.size()))
+        self.positionChanged.emit(0)
+
+    def load_live(self, wav_path: str, pitch: float) -> bool:
+        device = QMediaDevices.defaultAudioOutput()
+        _key, fmt, nchannels, data = self._decoded_data(wav_path, device)
+        # O LivePitchSource gera mono 16 bits; outras saidas usam o wav com pitch
+        if nchannels != 1 or fmt.sampleFormat() != QAudioFormat.SampleFormat.Int16:
+            return False
+        samples = np.frombuffer(data.data(), dtype="<i2").astype(np.float32)
+        self._attach_sink(device, fmt, nchannels)
+        self._live = LivePitchSource(samples, fmt.sampleRate(), pitch, self)
+        self._live.open(QIODevice.OpenModeFlag.ReadOnly)
+        self._device = self._live
+        self._start_bytes = 0
+        self.durationChanged.emit(self._bytes_to_ms(self._live.size()))
+        self.positionChanged.emit(0)
+        return True
+
+    def is_live(self) -> bool:
+        return self._live is not None
+
+    def set_pitch(self, pitch: float):
+        if self._live is not None:
+            self._live.set_pitch(pitch)
+
+    def clear(self):
+        self.stop()
+        self._drop_live()
+        self._buffer.close()
+        self._buffer.setData(QByteArray())
+        self._loaded_key = None
+        self._framerate = 0
+        self.durationChanged.emit(0)
+
+    def _resample(self, samples: np.ndarray, src_rate: int, dest_rate: int) -> np.ndarray:
+        dest_len = int(len(samples) * dest_rate / src_rate)
+        src_pos = np.arange(len(samples), dtype=np.float64)
+        dest_pos = np.linspace(0, len(samples) - 1, dest_len)
+        return np.stack(
+            [np.interp(dest_pos, src_pos, samples[:, ch]) for ch in range(samples.shape[1])],
+            axis=1,
+        ).astype(np.float32)
+
+    def _bytes_to_ms(self, byte_count: int) -> int:
+        if self._framerate <= 0:
+            return 0
+        return int(byte_count / self._bytes_per_frame * 1000 / self._framerate)
+
+    def _ms_to_bytes(self, ms: int) -> int:
+        frame = int(ms * self._framerate / 1000)
+        return max(0, min(frame * self._bytes_per_frame, self._device.size()))
+
+    def position(self) -> int:
+        if self._sink is None or self._state == self.StoppedState:
+            return self._bytes_to_ms(self._start_bytes)
+        return self._bytes_to_ms(self._start_bytes) + self._sink.processedUSecs() // 1000
+
+    def _emit_position(self):
+        self.positionChanged.emit(self.position())
+
+    def _set_state(self, state: int):
+        if state == self._state:
+            return
+        self._state = state
+        if state == self.PlayingState:
+            self._position_timer.start()
+        else:
+            self._position_timer.stop()
+        self.playbackStateChanged.emit(state)
+
+    def _start_sink(self) -> bool:
+        self._restarting = True
+        self._sink.stop()
+        self._device.seek(self._start_bytes)
+        self._sink.start(self._device)
+        self._restarting = False
+        return not self._fail_on_sink_error()
+
+    def _fail_on_sink_error(self) -> bool:
+        error = self._sink.error()
+        if error == QAudio.Error.NoError:
+            return False
+        self._restarting = True
+        self._sink.stop()
+        self._restarting = False
+        self._set_state(self.StoppedState)
+        self.errorOccurred.emit(f"Falha na saida de audio ({error.name}).")
+        return True
+
+    def play(self):
+        if self._sink is None or self._device.size() == 0:
+            return
+        if self._state == self.PausedState:
+            self._sink.resume()
+            if self._fail_on_sink_error():
+                return
+        elif self._state == self.StoppedState:
+            if self._start_bytes >= self._device.size():
+                self._start_bytes = 0
+            if not self._start_sink():
+                return
+        self._set_state(self.PlayingState)
+
+    def pause(self):
+        if self._state != self.PlayingState:
+            return
+        self._sink.suspend()
+        self._set_state(self.PausedState)
+
+    def stop(self):
+        if self._sink is not None and self._state != self.StoppedState:
+            self._restarting = True
+            self._sink.stop()
+            self._restarting = False
+        self._start_bytes = 0
+        self._set_state(self.StoppedState)
+
+    def setPosition(self, ms: int):
+        self._start_bytes = self._ms_to_bytes(ms)
+        if self._state != self.StoppedState:
+            paused = self._state == self.PausedState
+            if not self._start_sink():
+                return
+            if paused:
+                self._sink.suspend()
+        self.positionChanged.emit(self._bytes_to_ms(self._start_bytes))
+
+    def _on_sink_state_changed(self, state):
+        if self._restarting:
+            return
+        if state == QAudio.State.StoppedState:
+            self._fail_on_sink_error()
+            return
+        if state != QAudio.State.IdleState:
+            return
+        if self._sink.error() != QAudio.Error.NoError and not self._device.atEnd():
+            return
+        self._restarting = True
+        self._sink.stop()
+        self._restarting = False
+        self._start_bytes = self._device.size()
+        self.positionChanged.emit(self._bytes_to_ms(self._start_bytes))
+        self._set_state(self.StoppedState)
+        self.endOfMedia.emit()
+
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -329,200 +1476,72 @@ class MainWindow(QWidget):
         self._assets_dir = self._voices_dir
         self._service = TTSEngineService(self._voices_dir)
         self._last_wav_path = ""
-        self._preview_wav_path = ""
-        self._preview_pitch = 1.0
+        self._last_wav_valid = False
+        self._config_cache = None
+        self._config_dirty = True
+        self._pitched_preview_path = ""
+        self._pitched_preview_src = ""
+        self._pitched_preview_pitch = 1.0
+        self._live_pitch_path = ""
+        self._live_pitch_supported = False
+        self._synth_cache = OrderedDict()
+        self._wav_pool = _WavSlotPool(WAV_SLOT_POOL_SIZE)
+        self._cleanup_pool = ThreadPoolExecutor(max_workers=1)
+        self._pitch_process = None
+        self._pitch_process_pitch = 1.0
+        self._pitch_process_target = ""
+        self._pitch_process_running = False
         self._worker = None
+        self._req_id = 0
+        self._stale_workers = []
         self._pending_preview = False
         self._pending_save_path = ""
+        self._export_worker = None
+        self._export_source = ""
+        self._export_release_pending = False
         self._auto_generate_enabled = False
-        self._auto_pending = False
         self._is_busy = False
         self._seeking = False
         self._last_text_len = 0
-
+        self._text_change_delta = 0
+        self._text_change_guard = False
+        self._text_change_dropped = False
+        self._chunk_queue = []
+        self._chunk_files = []
+        self._streaming_chunks = False
+
+        self._dirty_flags = 0
+        self._config_version = 0
+        self._pending_schedule_key = None
         self._auto_timer = QTimer(self)
         self._auto_timer.setSingleShot(True)
         self._auto_timer.setInterval(AUTO_GENERATE_DELAY_MS)
         self._auto_timer.timeout.connect(self._auto_generate)
 
-        self._player = QMediaPlayer(self)
-        self._audio_output = QAudioOutput(self)
-        self._player.setAudioOutput(self._audio_output)
+        self._save_dialog = QFileDialog(self, "Salvar audio", "", "WAV (*.wav);;MP3 (*.mp3)")
+        self._save_dialog.setAcceptMode(QFileDialog.AcceptMode.AcceptSave)
+        self._save_dialog.setFileMode(QFileDialog.FileMode.AnyFile)
+        self._save_dialog.setDefaultSuffix("wav")
+        self._voices_dialog = QFileDialog(self, "Selecionar pasta de vozes")
+        self._voices_dialog.setFileMode(QFileDialog.FileMode.Directory)
+        self._voices_dialog.setOption(QFileDialog.Option.ShowDirsOnly, True)
+
+        self._player = PcmPlayer(self)
         self._player.positionChanged.connect(self._on_position_changed)
         self._player.durationChanged.connect(self._on_duration_changed)
         self._player.playbackStateChanged.connect(self._on_playback_state_changed)
+        self._player.endOfMedia.connect(self._on_end_of_media)
+        self._player.errorOccurred.connect(self._on_player_error)
         self._duration_ms = 0
 
         self._build_ui()
         self._apply_icons()
-        self._on_volume_changed()
         self._load_voices(show_warning=False)
         self._apply_theme()
+        self._on_volume_changed()
 
     def _apply_theme(self):
-        self.setStyleSheet(
-            """
-            QWidget {
-                background-color: #485161;
-                color: #e6e6e6;
-                font-size: 12px;
-            }
-            #headerBar {
-                background-color: #051F1C;
-            }
-            QLabel {
-                color: #f2f2f2;
-            }
-
-            #headerTitle {
-                font-weight: 600;
-                font-size: 13px;
-                color: #FFF;
-            }
-            #headerBar QPushButton {
-                color: #FFF;
-            }
-            QPushButton {
-                background-color: #323232;
-                border: 1px solid #3a3a3a;
-                padding: 4px 10px;
-                border-radius: 6px;
-            }
-            #headerBar QPushButton {
-                background-color: transparent;
-                border: none;
-            }
-            #clearButton {
-                background-color: transparent;
-                border: none;
-            }
-            QPushButton:hover {
-                background-color: #3b3b3b;
-            }
-            QPushButton:pressed {
-                background-color: #2b2b2b;
-            }
-            #closeButton {
-                background-color: #8a2f2f;
-                border-color: #9a3b3b;
-                font-weight: 600;
-            }
-            #closeButton:hover {
-                background-color: #b64545;
-            }
-            #stopButton {
-                background-color: #3a3a3a;
-                border-color: #4a4a4a;
-                font-weight: 600;
-            }
-            #stopButton:hover {
-                background-color: #4a4a4a;
-            }
-            #minButton {
-                font-weight: 700;
-            }
-            QComboBox, QSpinBox, QTextEdit {
-                background-color: #100626;
-                border: 1px solid #fff;
-                font-weight: 500;
-                border-radius: 6px;
-            }
-            QComboBox {
-                min-height: 20px;
-                padding: 2px 8px;
-            }
-            QComboBox QAbstractItemView::item {
-                min-height: 28px;
-                padding: 6px 8px;
-            }
-            QTextEdit {
-                padding: 6px;
-            }
-            QLabel#voiceDirLabel {
-                color: #bdbdbd;
-            }
-            QScrollBar:vertical {
-                background: #1a1a1a;
-                width: 12px;
-                margin: 2px 2px 2px 2px;
-                border-radius: 6px;
-            }
-            QScrollBar::add-page:vertical,
-            QScrollBar::sub-page:vertical {
-                background: #1a1a1a;
-                border-radius: 6px;
-            }
-            QScrollBar::handle:vertical {
-                background: #23d0a6;
-                min-height: 30px;
-                border-radius: 6px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background: #2ce2b5;
-            }
-            QScrollBar::add-line:vertical,
-            QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar:horizontal {
-                background: #1a1a1a;
-                height: 12px;
-                margin: 2px 2px 2px 2px;
-                border-radius: 6px;
-            }
-            QScrollBar::add-page:horizontal,
-            QScrollBar::sub-page:horizontal {
-                background: #1a1a1a;
-                border-radius: 6px;
-            }
-            QScrollBar::handle:horizontal {
-                background: #23d0a6;
-                min-width: 24px;
-                border-radius: 6px;
-            }
-            QScrollBar::handle:horizontal:hover {
-                background: #2ce2b5;
-            }
-            QScrollBar::add-line:horizontal,
-            QScrollBar::sub-line:horizontal {
-                width: 0px;
-            }
-            QProgressBar {
-                background-color: #1a1a1a;
-                border: 1px solid #333;
-                border-radius: 6px;
-                height: 10px;
-            }
-            QProgressBar::chunk {
-                background-color: #23d0a6;
-                border-radius: 6px;
-            }
-            #playbackSlider::groove:horizontal {
-                background: #1a1a1a;
-                border: 1px solid #333;
-                height: 8px;
-                border-radius: 4px;
-            }
-            #playbackSlider::sub-page:horizontal {
-                background: #23d0a6;
-                border-radius: 4px;
-            }
-            #playbackSlider::add-page:horizontal {
-                background: #1a1a1a;
-                border-radius: 4px;
-            }
-            #playbackSlider::handle:horizontal {
-                background: #f2f2f2;
-                border: 2px solid #0e6f5a;
-                width: 14px;
-                margin: -4px 0;
-                border-radius: 7px;
-            }
-            #playbackSlider::handle:horizontal:hover {
-                background: #ffffff;
-            }
-            """
-        )
+        self.setStyleSheet(STYLESHEET)
 
     def _icon_path(self, filename: str) -> Path:
         return self._assets_dir / filename
@@ -560,19 +1579,18 @@ class MainWindow(QWidget):
         label.setText("")
 
     def _update_preview_icon(self, state):
-        if self._play_icon is None or self._pause_icon is None:
-            return
-        if state == QMediaPlayer.PlaybackState.PlayingState:
+        if state == PcmPlayer.PlayingState:
             self.preview_btn.setIcon(self._pause_icon)
-            self.preview_btn.setIconSize(QSize(20, 20))
         else:
             self.preview_btn.setIcon(self._play_icon)
-            self.preview_btn.setIconSize(QSize(20, 20))
-        self.preview_btn.setText("")
 
     def _apply_icons(self):
         self._play_icon = self._load_icon("reproduzir.png")
+        if self._play_icon is None:
+            self._play_icon = self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPlay)
         self._pause_icon = self._load_icon("pausa.png")
+        if self._pause_icon is None:
+            self._pause_icon = self.style().standardIcon(QStyle.StandardPixmap.SP_MediaPause)
 
         self._set_button_icon(self.generate_btn, "gerar.png", "Gerar audio", 20)
         self._set_button_icon(self.stop_btn, "stop.png", "Stop", 20)
@@ -580,13 +1598,10 @@ class MainWindow(QWidget):
         self._set_button_icon(self.clear_btn, "limpar.png", "Limpar texto", 18)
         self._set_button_icon(self.voice_dir_btn, "folder.png", "Escolher pasta", 18)
 
-        if self._play_icon is not None:
-            self.preview_btn.setIcon(self._play_icon)
-            self.preview_btn.setIconSize(QSize(20, 20))
-            self.preview_btn.setText("")
-            self.preview_btn.setToolTip("Reproduzir / Pausar")
-        else:
-            self.preview_btn.setToolTip("Reproduzir / Pausar")
+        self.preview_btn.setIcon(self._play_icon)
+        self.preview_btn.setIconSize(QSize(20, 20))
+        self.preview_btn.setText("")
+        self.preview_btn.setToolTip("Reproduzir / Pausar")
 
         self._set_button_icon(self.header.min_btn, "mini.png", "Minimizar", 24)
         self._set_button_icon(self.header.close_btn, "fechar.png", "Fechar", 24)
@@ -615,7 +1630,7 @@ class MainWindow(QWidget):
         self.text_edit.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.text_edit.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
         self.text_edit.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.text_edit.textChanged.connect(self._on_text_changed)
+        self.text_edit.document().contentsChange.connect(self._on_text_changed)
 
         self.clear_btn = QPushButton("Limpar")
         self.clear_btn.setObjectName("clearButton")
@@ -633,15 +1648,7 @@ class MainWindow(QWidget):
         self.voice_dir_label.setToolTip(str(self._voices_dir))
 
         self.rate_combo = QComboBox()
-        rate_options = [
-            ("Lenticiomo", 90),
-            ("Muito Lento", 120),
-            ("Lento", 150),
-            ("Normal", 180),
-            ("Rapido", 210),
-            ("Muito Rapido", 240),
-            ("Super Rapido", 300),
-        ]
+        rate_options = RATE_OPTIONS
         for label, value in rate_options:
             self.rate_combo.addItem(f"{label} ({value})", value)
         default_index = next(
@@ -789,6 +1796,7 @@ class MainWindow(QWidget):
         self.setLayout(layout)
 
     def _load_voices(self, show_warning: bool):
+        self._config_dirty = True
         self.voice_combo.clear()
         voices = self._service.list_voices()
         if not voices:
@@ -804,45 +1812,182 @@ class MainWindow(QWidget):
             self.voice_combo.addItem(name, voice_path)
 
     def _current_config(self) -> TTSConfig:
+        if not self._config_dirty and self._config_cache is not None:
+            return self._config_cache
         voice_id = self.voice_combo.currentData()
         rate_data = self.rate_combo.currentData()
         rate = int(rate_data) if rate_data is not None else DEFAULT_RATE
         volume_data = self.volume_combo.currentData()
         volume = (int(volume_data) if volume_data is not None else 90) / 100.0
         pitch = self._current_pitch()
-        return TTSConfig(voice_id=voice_id, rate=rate, volume=volume, pitch=pitch)
+        self._config_cache = TTSConfig(voice_id=voice_id, rate=rate, volume=volume, pitch=pitch)
+        self._config_dirty = False
+        return self._config_cache
 
     def _current_pitch(self) -> float:
         pitch_data = self.pitch_combo.currentData()
         return (int(pitch_data) if pitch_data is not None else 100) / 100.0
 
     def _ensure_preview_audio(self) -> str:
-        if not self._last_wav_path or not os.path.exists(self._last_wav_path):
+        if not self._last_wav_valid:
             return ""
 
         pitch = self._current_pitch()
         if abs(pitch - 1.0) < 0.001:
-            self._preview_wav_path = ""
-            self._preview_pitch = pitch
             return self._last_wav_path
 
         if (
-            self._preview_wav_path
-            and abs(self._preview_pitch - pitch) < 0.001
-            and os.path.exists(self._preview_wav_path)
+            self._pitched_preview_path
+            and self._pitched_preview_src == self._last_wav_path
+            and abs(self._pitched_preview_pitch - pitch) < 0.001
         ):
-            return self._preview_wav_path
+            return self._pitched_preview_path
+
+        # Formatos fora do alcance do LivePitchSource: pitch via ffmpeg em segundo plano
+        if self._pitch_process_running:
+            if abs(self._pitch_process_pitch - pitch) < 0.001:
+                return ""
+            self._cancel_pitch_process()
 
-        tmp_path = self._new_temp_wav()
+        self._clear_pitched_preview()
+        tmp_path = self._acquire_wav_slot()
         try:
-            self._service.apply_pitch_to_wav(self._last_wav_path, tmp_path, pitch)
+            cmd = self._service.build_pitch_command(self._last_wav_path, tmp_path, pitch)
         except Exception as exc:
+            self._release_wav_slot(tmp_path)
             QMessageBox.critical(self, "Erro", str(exc))
             return ""
 
-        self._preview_wav_path = tmp_path
-        self._preview_pitch = pitch
-        return tmp_path
+        src_path = self._last_wav_path
+        process = QProcess(self)
+        process.finished.connect(
+            lambda exit_code, _status: self._on_pitch_process_finished(
+                process, exit_code, src_path, tmp_path, pitch
+            )
+        )
+        self._pitch_process = process
+        self._pitch_process_pitch = pitch
+        self._pitch_process_target = tmp_path
+        self._pitch_process_running = True
+        self.status_label.setText("Ajustando pitch...")
+        # ffmpeg -y sobrescreve no lugar; o slot pode ser hardlink de uma entrada do cache
+        self._service._detach_output(tmp_path)
+        process.start(cmd[0], cmd[1:])
+        return ""
+
+    def _cancel_pitch_process(self):
+        process = self._pitch_process
+        self._pitch_process = None
+        self._pitch_process_running = False
+        if process is not None:
+            process.finished.disconnect()
+            process.kill()
+            process.waitForFinished(1000)
+            process.deleteLater()
+            self._release_wav_slot(self._pitch_process_target)
+        self._pitch_process_target = ""
+
+    def _on_pitch_process_finished(
+        self, process: QProcess, exit_code: int, src_path: str, tmp_path: str, pitch: float
+    ):
+        if process is not self._pitch_process:
+            return
+        self._pitch_process = None
+        self._pitch_process_running = False
+        process.deleteLater()
+
+        if exit_code != 0:
+            self._release_wav_slot(tmp_path)
+            detail = bytes(process.readAllStandardError()).decode(errors="replace").strip()
+            QMessageBox.critical(self, "Erro", detail or "Falha ao ajustar o pitch.")
+            return
+        if src_path != self._last_wav_path or abs(self._current_pitch() - pitch) >= 0.001:
+            self._release_wav_slot(tmp_path)
+            return
+
+        self._pitched_preview_path = tmp_path
+        self._pitched_preview_src = src_path
+        self._pitched_preview_pitch = pitch
+        self._play_preview(tmp_path)
+
+    def _acquire_wav_slot(self) -> str:
+        # Com o pool cheio, descarta as entradas mais antigas do cache antes de crescer
+        while not self._wav_pool.has_free() and self._evict_oldest_slot():
+            pass
+        return self._wav_pool.acquire()
+
+    def _evict_oldest_slot(self) -> bool:
+        for key, path in self._synth_cache.items():
+            if path not in (self._last_wav_path, self._export_source):
+                del self._synth_cache[key]
+                self._release_wav_slot(path)
+                return True
+        return False
+
+    def _release_wav_slot(self, path: str):
+        if not path:
+            return
+        # O ExportWorker ainda le este wav; a liberacao fica para _on_exported
+        if path == self._export_source:
+            self._export_release_pending = True
+            return
+        self._wav_pool.release(path)
+
+    def _store_synth_result(self, key: str, path: str):
+        self._synth_cache[key] = path
+        self._synth_cache.move_to_end(key)
+        while len(self._synth_cache) > SYNTH_MEMO_SIZE:
+            _key, old_path = self._synth_cache.popitem(last=False)
+            self._release_wav_slot(old_path)
+
+    def _clear_synth_cache(self):
+        for path in self._synth_cache.values():
+            self._release_wav_slot(path)
+        self._synth_cache.clear()
+
+    def _clear_pitched_preview(self):
+        self._release_wav_slot(self._pitched_preview_path)
+        self._pitched_preview_path = ""
+        self._pitched_preview_src = ""
+
+    def _can_play_live(self) -> bool:
+        if self._live_pitch_path != self._last_wav_path:
+            self._live_pitch_path = self._last_wav_path
+            self._live_pitch_supported = self._service.can_shift_pitch_in_process(
+                self._last_wav_path
+            )
+        return self._live_pitch_supported
+
+    def _play_live_preview(self) -> bool:
+        if not self._last_wav_valid:
+            return False
+        pitch = self._current_pitch()
+        if abs(pitch - 1.0) < 0.001 or not self._can_play_live():
+            return False
+        # Pitch aplicado em blocos durante a reproducao, sem gravar um wav novo
+        try:
+            if not self._player.load_live(self._last_wav_path, pitch):
+                return False
+        except Exception as exc:
+            QMessageBox.critical(self, "Erro", str(exc))
+            return True
+        self._player.play()
+        self.status_label.setText("Reproduzindo preview")
+        return True
+
+    def _play_preview(self, preview_path: str):
+        if not self._load_into_player(preview_path):
+            return
+        self._player.play()
+        self.status_label.setText("Reproduzindo preview")
+
+    def _load_into_player(self, wav_path: str) -> bool:
+        try:
+            self._player.load(wav_path)
+        except Exception as exc:
+            QMessageBox.critical(self, "Erro", str(exc))
+            return False
+        return True
 
     def _ensure_text(self, show_warning: bool) -> str:
         text = self.text_edit.toPlainText().strip()
@@ -852,11 +1997,6 @@ class MainWindow(QWidget):
             return ""
         return text
 
-    def _new_temp_wav(self) -> str:
-        fd, path = tempfile.mkstemp(suffix=".wav")
-        os.close(fd)
-        return path
-
     def _set_busy(self, busy: bool):
         self._is_busy = busy
         self.generate_btn.setEnabled(not busy)
@@ -869,74 +2009,143 @@ class MainWindow(QWidget):
             self.generation_progress.setRange(0, 1)
             self.generation_progress.setValue(0)
 
-    def _schedule_auto_generate(self, delay_ms: int | None = None):
+    def _schedule_key(self, delay_ms: int) -> tuple:
+        # Tamanho + final do texto: barato e suficiente para detectar eventos repetidos
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.movePosition(
+            QTextCursor.MoveOperation.Left,
+            QTextCursor.MoveMode.KeepAnchor,
+            SCHEDULE_TAIL_CHARS,
+        )
+        return (self._last_text_len, hash(cursor.selectedText()), self._config_version, delay_ms)
+
+    def _schedule_auto_generate(self, dirty: int, delay_ms: int = AUTO_GENERATE_DELAY_MS):
+        self._dirty_flags |= dirty
         if not self._auto_generate_enabled:
             return
-        if self._is_busy:
-            self._auto_pending = True
+        key = self._schedule_key(delay_ms)
+        if key == self._pending_schedule_key and self._auto_timer.isActive():
             return
-        if delay_ms is not None:
+        self._pending_schedule_key = key
+        if self._auto_timer.interval() != delay_ms:
             self._auto_timer.setInterval(delay_ms)
-        else:
-            self._auto_timer.setInterval(AUTO_GENERATE_DELAY_MS)
         self._auto_timer.start()
 
     def _auto_generate(self):
+        # Varias mudancas na mesma janela viram uma unica geracao
+        if not self._dirty_flags:
+            return
         self._generate_audio(manual=False)
 
-    def _on_text_changed(self):
-        text_len = len(self.text_edit.toPlainText())
-        delta = text_len - self._last_text_len
-        self._last_text_len = text_len
+    def _cancel_worker(self):
+        worker = self._worker
+        worker.request_cancel()
+        worker.finished.disconnect(self._on_generated)
+        worker.chunk_ready.disconnect(self._on_chunk_ready)
+        self._stale_workers.append(worker)
+        self._worker = None
+        self._set_busy(False)
+
+    def _prune_stale_workers(self):
+        running = []
+        for worker in self._stale_workers:
+            if worker.isRunning():
+                running.append(worker)
+            else:
+                self._release_wav_slot(worker.out_path)
+        self._stale_workers = running
+
+    def _is_stale_signal(self) -> bool:
+        worker = self.sender()
+        return isinstance(worker, SynthesisWorker) and worker.req_id != self._req_id
+
+    def _on_text_changed(self, _position: int, chars_removed: int, chars_added: int):
+        # Comprimento mantido incrementalmente para nao materializar o texto a cada tecla
+        delta = chars_added - chars_removed
+        self._last_text_len += delta
+        self._text_change_delta += delta
+        if self._text_change_guard:
+            self._text_change_dropped = True
+            return
+        self._apply_text_change()
+
+    def _apply_text_change(self):
+        self._text_change_guard = True
+        QTimer.singleShot(TEXT_CHANGE_THROTTLE_MS, self._release_text_change_guard)
 
-        if delta >= PASTE_DELTA_THRESHOLD or text_len >= LARGE_TEXT_THRESHOLD:
-            self._schedule_auto_generate(AUTO_GENERATE_DELAY_LARGE_MS)
+        delta = self._text_change_delta
+        self._text_change_delta = 0
+        if delta >= PASTE_DELTA_THRESHOLD or self._last_text_len >= LARGE_TEXT_THRESHOLD:
+            self._schedule_auto_generate(DIRTY_TEXT, AUTO_GENERATE_DELAY_LARGE_MS)
         else:
-            self._schedule_auto_generate()
+            self._schedule_auto_generate(DIRTY_TEXT)
+
+    def _release_text_change_guard(self):
+        self._text_change_guard = False
+        if self._text_change_dropped:
+            self._text_change_dropped = False
+            self._apply_text_change()
 
     def _on_params_changed(self, _value=None):
-        self._schedule_auto_generate()
+        self._config_dirty = True
+        self._config_version += 1
+        self._schedule_auto_generate(DIRTY_PARAMS)
 
     def _on_volume_changed(self, _value=None):
-        volume_data = self.volume_combo.currentData()
-        volume = (int(volume_data) if volume_data is not None else 90) / 100.0
-        self._audio_output.setVolume(volume)
+        self._config_dirty = True
+        self._player.setVolume(self._current_config().volume)
 
     def _on_pitch_changed(self, _value=None):
-        self._preview_wav_path = ""
-        self._preview_pitch = self._current_pitch()
-        if self._player.playbackState() != QMediaPlayer.PlaybackState.StoppedState:
+        self._config_dirty = True
+        if (
+            self._last_wav_valid
+            and self._player.is_live()
+            and self._player.playbackState() != PcmPlayer.StoppedState
+        ):
+            self._player.set_pitch(self._current_pitch())
+            return
+
+        self._finish_chunk_stream()
+        if (
+            self._pitch_process_running
+            or self._player.playbackState() != PcmPlayer.StoppedState
+        ):
             self._player.stop()
+            if self._play_live_preview():
+                return
             preview_path = self._ensure_preview_audio()
             if preview_path:
-                self._player.setSource(QUrl.fromLocalFile(preview_path))
-                self._player.play()
+                self._play_preview(preview_path)
 
     def _on_auto_toggle(self, checked: bool):
         self._auto_generate_enabled = checked
 
     def on_change_voices_dir(self):
-        selected = QFileDialog.getExistingDirectory(
-            self,
-            "Selecionar pasta de vozes",
-            str(self._voices_dir),
-        )
-        if not selected:
+        self._voices_dialog.setDirectory(str(self._voices_dir))
+        if not self._voices_dialog.exec():
             return
+        selected = self._voices_dialog.selectedFiles()[0]
 
         self._voices_dir = Path(selected)
         self._service.set_voices_dir(self._voices_dir)
         self.voice_dir_label.setText(str(self._voices_dir))
         self.voice_dir_label.setToolTip(str(self._voices_dir))
         self._last_wav_path = ""
-        self._preview_wav_path = ""
+        self._last_wav_valid = False
+        self._live_pitch_path = ""
+        self._clear_synth_cache()
+        self._clear_pitched_preview()
         self._load_voices(show_warning=True)
 
     def _generate_audio(self, manual: bool):
-        if self._is_busy:
-            if not manual:
-                self._auto_pending = True
+        if self._is_busy and manual:
             return
+        # O texto lido agora ja cobre eventos pendentes do throttle e do timer
+        self._dirty_flags = 0
+        self._text_change_dropped = False
+        self._text_change_delta = 0
+        self._auto_timer.stop()
 
         text = self._ensure_text(show_warning=manual)
         if not text:
@@ -947,14 +2156,34 @@ class MainWindow(QWidget):
                 QMessageBox.warning(self, "Aviso", "Selecione uma voz .onnx.")
             return
 
+        config = self._current_config()
+        key = self._service._cache_key(text, config)
+        if self._worker is not None and self._worker.isRunning():
+            # Pitch e volume nao entram na sintese: so texto, voz e velocidade importam
+            if self._service._cache_key(self._worker.text, self._worker.config) == key:
+                return
+            self._cancel_worker()
+
         if manual:
             self._auto_generate_enabled = True
 
-        out_path = self._new_temp_wav()
-        config = self._current_config()
+        cached_path = self._synth_cache.get(key)
+        if cached_path:
+            self._synth_cache.move_to_end(key)
+            self._finish_chunk_stream()
+            self._on_generated(True, "cached", cached_path)
+            return
+
+        out_path = self._acquire_wav_slot()
+        self._finish_chunk_stream()
         self._set_busy(True)
 
-        self._worker = SynthesisWorker(self._service, text, config, out_path)
+        self._prune_stale_workers()
+        self._req_id += 1
+        self._worker = SynthesisPipelineWorker(
+            self._service, text, config, out_path, self._req_id
+        )
+        self._worker.chunk_ready.connect(self._on_chunk_ready)
         self._worker.finished.connect(self._on_generated)
         self._worker.start()
 
@@ -962,17 +2191,84 @@ class MainWindow(QWidget):
         self.auto_toggle.setChecked(True)
         self._generate_audio(manual=True)
 
+    def _on_chunk_ready(self, idx: int, path: str):
+        if self._is_stale_signal():
+            return
+        self._chunk_files.append(path)
+        if idx == 0:
+            if not self._pending_preview or abs(self._current_pitch() - 1.0) >= 0.001:
+                return
+            self._pending_preview = False
+            self._streaming_chunks = True
+            self._play_preview(path)
+            return
+
+        if not self._streaming_chunks:
+            return
+        self._chunk_queue.append(path)
+        if self._player.playbackState() == PcmPlayer.StoppedState:
+            self._play_next_chunk()
+
+    def _play_next_chunk(self):
+        if not self._chunk_queue:
+            if not self._is_busy:
+                self._finish_chunk_stream()
+            return
+        if self._load_into_player(self._chunk_queue.pop(0)):
+            self._player.play()
+
+    def _finish_chunk_stream(self):
+        self._streaming_chunks = False
+        self._chunk_queue = []
+        # Remocao fora da thread da UI: em discos lentos o unlink pode travar a janela
+        for chunk_path in self._chunk_files:
+            self._cleanup_pool.submit(_safe_unlink, chunk_path)
+        self._chunk_files = []
+
+    def _on_player_error(self, message: str):
+        self._finish_chunk_stream()
+        self.status_label.setText("Pronto")
+        QMessageBox.critical(self, "Erro", message)
+
+    def _on_end_of_media(self):
+        if self._streaming_chunks:
+            self._play_next_chunk()
+
     def _on_generated(self, ok: bool, message: str, path: str):
+        worker = self.sender()
+        if not isinstance(worker, SynthesisWorker):
+            worker = None
+        elif worker is not self._worker or worker.cancelled:
+            return
         self._set_busy(False)
         if not ok:
+            if worker is not None:
+                self._release_wav_slot(worker.out_path)
+            self._last_wav_valid = False
+            self._finish_chunk_stream()
             QMessageBox.critical(self, "Erro", message)
             return
 
-        self._last_wav_path = path
-        self._preview_wav_path = ""
-        self._preview_pitch = 1.0
+        self._last_wav_valid = True
+        if worker is not None:
+            self._store_synth_result(self._service._cache_key(worker.text, worker.config), path)
+        self._live_pitch_path = ""
+        if self._last_wav_path != path:
+            self._last_wav_path = path
+            self._clear_pitched_preview()
         self.status_label.setText("Audio gerado em buffer temporario")
 
+        if self._streaming_chunks:
+            self.status_label.setText("Reproduzindo preview")
+            if (
+                not self._chunk_queue
+                and self._player.playbackState() == PcmPlayer.StoppedState
+            ):
+                self._finish_chunk_stream()
+        else:
+            # Trechos ja concatenados no wav final; so sao mantidos durante o streaming
+            self._finish_chunk_stream()
+
         if self._pending_preview:
             self._pending_preview = False
             self.on_preview()
@@ -984,36 +2280,50 @@ class MainWindow(QWidget):
             self._save_to_path(pending_path)
             return
 
-        if self._auto_pending:
-            self._auto_pending = False
-            self._auto_timer.start()
+    def closeEvent(self, event):
+        if self._worker is not None and self._worker.isRunning():
+            self._cancel_worker()
+        # Workers cancelados encerram o piper e apagam seus trechos antes de sair
+        for worker in self._stale_workers:
+            worker.wait()
+        self._prune_stale_workers()
+        if self._pitch_process_running:
+            self._cancel_pitch_process()
+        if self._export_worker is not None:
+            self._export_worker.wait()
+        self._player.clear()
+        self._finish_chunk_stream()
+        for path in self._wav_pool.drain():
+            self._cleanup_pool.submit(_safe_unlink, path)
+        self._cleanup_pool.shutdown(wait=False)
+        super().closeEvent(event)
 
     def on_preview(self):
-        if not self._last_wav_path or not os.path.exists(self._last_wav_path):
+        if not self._last_wav_valid:
             self._pending_preview = True
             self.on_generate()
             return
 
-        if self._player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
+        if self._player.playbackState() == PcmPlayer.PlayingState:
             self._player.pause()
             self.status_label.setText("Pausado")
             return
 
-        if self._player.playbackState() == QMediaPlayer.PlaybackState.PausedState:
+        if self._player.playbackState() == PcmPlayer.PausedState:
             self._player.play()
             self.status_label.setText("Reproduzindo preview")
             return
 
+        if self._play_live_preview():
+            return
         preview_path = self._ensure_preview_audio()
         if not preview_path:
             return
-        self._on_volume_changed()
-        self._player.setSource(QUrl.fromLocalFile(preview_path))
-        self._player.play()
-        self.status_label.setText("Reproduzindo preview")
+        self._play_preview(preview_path)
 
     def on_stop(self):
         self._player.stop()
+        self._finish_chunk_stream()
         self._player.setPosition(0)
         self.playback_slider.setValue(0)
         self.status_label.setText("Parado")
@@ -1031,17 +2341,10 @@ class MainWindow(QWidget):
             self.playback_slider.setValue(position)
 
     def _on_playback_state_changed(self, state):
-        if state == QMediaPlayer.PlaybackState.StoppedState:
+        if state == PcmPlayer.StoppedState:
             if self.playback_slider.value() < self._duration_ms:
                 self.playback_slider.setValue(0)
-        if self._play_icon is not None and self._pause_icon is not None:
-            self._update_preview_icon(state)
-            return
-
-        if state == QMediaPlayer.PlaybackState.PlayingState:
-            self.preview_btn.setText("Pausar Preview")
-        else:
-            self.preview_btn.setText("Reproduzir Preview")
+        self._update_preview_icon(state)
 
     def _on_seek_start(self):
         self._seeking = True
@@ -1056,50 +2359,47 @@ class MainWindow(QWidget):
             self._player.setPosition(self.playback_slider.value())
 
     def _save_to_path(self, file_path: str):
-        ext = os.path.splitext(file_path)[1].lower()
-        volume = self._current_config().volume
-        pitch = self._current_pitch()
-        temp_pitch = ""
-        try:
-            src_path = self._last_wav_path
-            if abs(pitch - 1.0) >= 0.001:
-                temp_pitch = self._new_temp_wav()
-                self._service.apply_pitch_to_wav(src_path, temp_pitch, pitch)
-                src_path = temp_pitch
-            if ext == ".mp3":
-                self._service.convert_wav_to_mp3(src_path, file_path, volume)
-            else:
-                if abs(volume - 1.0) < 0.001:
-                    shutil.copyfile(src_path, file_path)
-                else:
-                    self._service._apply_volume_to_wav(src_path, file_path, volume)
-        except Exception as exc:
-            QMessageBox.critical(self, "Erro", str(exc))
+        # _export_source so e limpo em _on_exported, depois do worker terminar
+        if self._export_source or (
+            self._export_worker is not None and self._export_worker.isRunning()
+        ):
+            QMessageBox.warning(self, "Aviso", "Aguarde o termino da exportacao atual.")
+            return
+
+        config = self._current_config()
+        self._export_source = self._last_wav_path
+        self._export_worker = ExportWorker(
+            self._service, self._last_wav_path, file_path, config.pitch, config.volume
+        )
+        self._export_worker.finished.connect(self._on_exported)
+        self.save_btn.setEnabled(False)
+        self.status_label.setText("Salvando...")
+        self._export_worker.start()
+
+    def _on_exported(self, ok: bool, message: str, path: str):
+        source = self._export_source
+        self._export_source = ""
+        if self._export_release_pending:
+            self._export_release_pending = False
+            self._release_wav_slot(source)
+        self.save_btn.setEnabled(not self._is_busy)
+        if not ok:
+            self.status_label.setText("Pronto")
+            QMessageBox.critical(self, "Erro", message)
             return
-        finally:
-            if temp_pitch and os.path.exists(temp_pitch):
-                try:
-                    os.remove(temp_pitch)
-                except Exception:
-                    pass
 
-        self.status_label.setText(f"Salvo: {file_path}")
+        self.status_label.setText(f"Salvo: {path}")
 
     def on_save(self):
         text = self._ensure_text(show_warning=True)
         if not text:
             return
 
-        file_path, _selected_filter = QFileDialog.getSaveFileName(
-            self,
-            "Salvar audio",
-            "",
-            "WAV (*.wav);;MP3 (*.mp3)",
-        )
-        if not file_path:
+        if not self._save_dialog.exec():
             return
+        file_path = self._save_dialog.selectedFiles()[0]
 
-        if not self._last_wav_path or not os.path.exists(self._last_wav_path):
+        if not self._last_wav_valid:
             self._pending_save_path = file_path
             self.on_generate()
             return
@@ -1109,6 +2409,7 @@ class MainWindow(QWidget):
 
 def main():
     app = QApplication([])
+    app.setApplicationName("Text-To-Audio")
     window = MainWindow()
     window.show()
     app.exec()